@@ -4,14 +4,14 @@ import sys
 import time
 import threading
 import subprocess
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from rich.live import Live
 from rich.console import Console
 
 from utils import (
-    load_config, PipelineConfig, TopicConfig, ArtifactConfig,
-    run_nlm, extract_notebook_id, extract_task_id, parse_latest_artifacts, safe_filename,
-    StateManager, StatusDashboard
+    load_config, validate_config, iter_topics, PipelineConfig, TopicConfig, ArtifactConfig,
+    run_nlm, run_nlm_status, extract_notebook_id, extract_task_id, parse_latest_artifacts, safe_filename,
+    StateManager, StatusDashboard, QuotaPlanner, OutputStore, NotebookPool
 )
 
 # Status Symbols
@@ -22,10 +22,13 @@ POLLING = "[bold cyan]⧖[/bold cyan]"
 
 CONSOLE = Console()
 
-def topic_worker(topic: TopicConfig, config: PipelineConfig, state: StateManager, dashboard: StatusDashboard, index: int):
+def topic_worker(topic: TopicConfig, config: PipelineConfig, state: StateManager, dashboard: StatusDashboard, store: OutputStore, index: int, quota: QuotaPlanner = None, pool: NotebookPool = None):
     key = topic.key
     nb_id = topic.notebook_id or state.get_notebook_id(key)
 
+    # Research already force-restarted earlier in this quota batch must not be thrown away again
+    research_force = config.research_force and not (quota and quota.is_force_done(key))
+
     # Resolve effective artifacts: topic-level overrides global
     effective_artifacts = topic.artifacts if topic.artifacts is not None else config.artifacts
     artifact_types = [a.type for a in effective_artifacts]
@@ -54,7 +57,7 @@ def topic_worker(topic: TopicConfig, config: PipelineConfig, state: StateManager
                 dashboard.update_status(key, art, NOT_DONE, "Cleared")
 
     # 0.7 Force-Restart Research?
-    if config.research_force and state.is_research_done(key):
+    if research_force and state.is_research_done(key):
         # We keep the notebook, but clear everything else to force a full redo
         dashboard.update_status(key, "msg", "Force-clearing state...")
         state.reset_topic_progress(key)
@@ -64,74 +67,103 @@ def topic_worker(topic: TopicConfig, config: PipelineConfig, state: StateManager
             dashboard.update_status(key, art, NOT_DONE, "Restarting")
         
     if not nb_id:
-        dashboard.update_status(key, "notebook", PENDING, "Creating...")
-        out = run_nlm(["create", "notebook", topic.title], log_key=key)
-        nb_id = extract_notebook_id(out)
+        # Pre-warmed notebooks skip the create round-trip; fall back to creating on a miss
+        nb_id = pool.acquire(key, topic.title) if pool else ""
         if nb_id:
-            state.set_notebook_id(key, nb_id)
-            dashboard.update_status(key, "notebook", DONE, "Created.")
+            dashboard.update_status(key, "notebook", DONE, "Assigned from pool.")
         else:
-            dashboard.update_status(key, "notebook", NOT_DONE, "Failed creation.")
-            return
+            dashboard.update_status(key, "notebook", PENDING, "Creating...")
+            out = run_nlm(["create", "notebook", topic.title], log_key=key)
+            nb_id = extract_notebook_id(out)
+            if nb_id:
+                state.set_notebook_id(key, nb_id)
+                dashboard.update_status(key, "notebook", DONE, "Created.")
+            else:
+                dashboard.update_status(key, "notebook", NOT_DONE, "Failed creation.")
+                return
     else:
         dashboard.update_status(key, "notebook", DONE, "Verified.")
 
-    # 1.5 Sources
-    if topic.sources and not state.is_artifact_done(key, "sources_processed"):
-        dashboard.update_status(key, "msg", "Adding sources...")
-        expected_source_count = len(topic.sources)
-
-        for src in topic.sources:
-            cmd = ["source", "add", nb_id]
-            if src.type == "url": cmd.extend(["--url", src.value])
-            elif src.type == "file": cmd.extend(["--file", src.value])
-            elif src.type == "text": cmd.extend(["--text", src.value, "--title", src.title or "Untitled Text"])
-            elif src.type == "drive": cmd.extend(["--drive", src.value])
-            elif src.type == "youtube": cmd.extend(["--youtube", src.value])
-            run_nlm(cmd, timeout=120, log_key=key)
-
-        # Poll to verify sources are processed before continuing
-        dashboard.update_status(key, "msg", "Waiting for sources to process...")
-        max_source_wait = 60  # 60 attempts = up to 5 minutes
-        for attempt in range(max_source_wait):
-            nb_info = run_nlm(["get", "notebook", nb_id], timeout=30, log_key=key)
-
-            # Check if sources are mentioned and processed
-            # NotebookLM output typically shows "X sources" when ready
-            if nb_info and ("source" in nb_info.lower()):
-                # Give a bit more time for processing to stabilize
-                time.sleep(5)
-                state.set_artifact_done(key, "sources_processed")
-                dashboard.update_status(key, "msg", "Sources processed ✓")
-                break
-
-            time.sleep(5)
-        else:
-            dashboard.update_status(key, "msg", "[red]Error: Sources failed to process[/red]")
-            return  # Don't continue if sources aren't ready
-    elif topic.sources:
-        dashboard.update_status(key, "msg", "Sources already processed ✓")
-
-    # 1.7 Chat Config
+    # 1.2 Chat Config — only sets notebook-level chat settings (goal, length, prompt), which
+    # don't depend on sources, so it runs alongside source processing
+    chat_thread = None
+    chat_result = []
     if topic.chat:
-        dashboard.update_status(key, "msg", "Configuring chat...")
         chat_args = ["chat", "configure", nb_id, "--goal", topic.chat.goal, "--response-length", topic.chat.response_length]
         if topic.chat.goal == "custom" and topic.chat.prompt:
             chat_args.extend(["--prompt", topic.chat.prompt])
-        run_nlm(chat_args, log_key=key)
+        chat_thread = threading.Thread(
+            target=lambda: chat_result.append(run_nlm_status(chat_args, log_key=key)), daemon=True
+        )
+        chat_thread.start()
+
+    try:
+        # 1.5 Sources
+        if topic.sources and not state.is_artifact_done(key, "sources_processed"):
+            dashboard.update_status(key, "msg", "Adding sources...")
+            expected_source_count = len(topic.sources)
+
+            for src in topic.sources:
+                cmd = ["source", "add", nb_id]
+                if src.type == "url": cmd.extend(["--url", src.value])
+                elif src.type == "file": cmd.extend(["--file", src.value])
+                elif src.type == "text": cmd.extend(["--text", src.value, "--title", src.title or "Untitled Text"])
+                elif src.type == "drive": cmd.extend(["--drive", src.value])
+                elif src.type == "youtube": cmd.extend(["--youtube", src.value])
+                run_nlm(cmd, timeout=120, log_key=key)
+
+            # Poll to verify sources are processed before continuing
+            dashboard.update_status(key, "msg", "Waiting for sources to process...")
+            max_source_wait = 60  # 60 attempts = up to 5 minutes
+            for attempt in range(max_source_wait):
+                nb_info = run_nlm(["get", "notebook", nb_id], timeout=30, log_key=key)
+
+                # Check if sources are mentioned and processed
+                # NotebookLM output typically shows "X sources" when ready
+                if nb_info and ("source" in nb_info.lower()):
+                    # Give a bit more time for processing to stabilize
+                    time.sleep(5)
+                    state.set_artifact_done(key, "sources_processed")
+                    dashboard.update_status(key, "msg", "Sources processed ✓")
+                    break
+
+                time.sleep(5)
+            else:
+                dashboard.update_status(key, "msg", "[red]Error: Sources failed to process[/red]")
+                return  # Don't continue if sources aren't ready
+        elif topic.sources:
+            dashboard.update_status(key, "msg", "Sources already processed ✓")
+
+        # 1.7 Chat Config (started at 1.2)
+        if chat_thread and chat_thread.is_alive():
+            dashboard.update_status(key, "msg", "Configuring chat...")
+    finally:
+        # Joined on every exit path, including the early return above
+        if chat_thread:
+            chat_thread.join()
+    if chat_result and not chat_result[0][0]:
+        dashboard.update_status(key, "msg", "[yellow]Chat configure failed (see logs); continuing[/yellow]")
 
     # 2. Research
-    if topic.query and (not state.is_research_done(key) or config.research_force):
+    if topic.query and (not state.is_research_done(key) or research_force):
         dashboard.update_status(key, "research", PENDING, "Reviewing...")
         status_out = run_nlm(["research", "status", nb_id], timeout=60, log_key=key)
         
         needs_start = "no research found" in status_out.lower() or not status_out
-        if config.research_force: needs_start = True
+        if research_force: needs_start = True
 
         if needs_start:
+            if quota and not quota.reserve(key, "research"):
+                if quota.is_unschedulable(key, "research"):
+                    dashboard.update_status(key, "research", NOT_DONE, "No quota budget.")
+                    dashboard.update_status(key, "msg", "[red]Skipped: research budget is 0[/red]")
+                else:
+                    dashboard.update_status(key, "research", PENDING, "Deferred (quota).")
+                    dashboard.update_status(key, "msg", "[yellow]Deferred to next quota window[/yellow]")
+                return
             dashboard.update_status(key, "research", PENDING, "Starting...")
             start_args = ["research", "start", "--mode", config.research_mode, "--source", config.research_source, "--notebook-id", nb_id]
-            if config.research_force: start_args.append("--force")
+            if research_force: start_args.append("--force")
             start_args.append(topic.query)
             run_nlm(start_args, timeout=360, log_key=key) # Increased for deep research
             
@@ -181,6 +213,8 @@ def topic_worker(topic: TopicConfig, config: PipelineConfig, state: StateManager
         dashboard.update_status(key, "msg", "[red]Skipping artifacts: Research not complete[/red]")
         return
 
+    deferred = set()
+    skipped = set()  # No quota budget at all; never retried by later windows
     if effective_artifacts:
         needed_artifacts = [a for a in effective_artifacts if not state.is_artifact_done(key, a.type)]
         if needed_artifacts:
@@ -194,6 +228,14 @@ def topic_worker(topic: TopicConfig, config: PipelineConfig, state: StateManager
             }
 
             for art_cfg in needed_artifacts:
+                if quota and not quota.reserve(key, art_cfg.type):
+                    if quota.is_unschedulable(key, art_cfg.type):
+                        skipped.add(art_cfg.type)
+                        dashboard.update_status(key, art_cfg.type, NOT_DONE, "No quota budget.")
+                    else:
+                        deferred.add(art_cfg.type)
+                        dashboard.update_status(key, art_cfg.type, PENDING, "Deferred (quota).")
+                    continue
                 dashboard.update_status(key, art_cfg.type, PENDING, "Creating...")
                 subcmd = type_map.get(art_cfg.type, art_cfg.type.replace("_", "-"))
                 cmd = ["create", subcmd, nb_id, "--confirm"]
@@ -214,13 +256,14 @@ def topic_worker(topic: TopicConfig, config: PipelineConfig, state: StateManager
                 time.sleep(2)
 
             # Poll/Revise/Rename
+            active_artifacts = [a for a in effective_artifacts if a.type not in deferred | skipped]
             dashboard.update_status(key, "msg", "Polling artifacts...")
-            for i in range(30):
+            for i in range(30 if active_artifacts else 0):
                 out = run_nlm(["studio", "status", nb_id, "--json"], timeout=60, log_key=key)
                 latest = parse_latest_artifacts(out)
 
                 all_done = True
-                for art_cfg in effective_artifacts:
+                for art_cfg in active_artifacts:
                     art_data = latest.get(art_cfg.type)
                     if not art_data:
                         all_done = False
@@ -258,34 +301,53 @@ def topic_worker(topic: TopicConfig, config: PipelineConfig, state: StateManager
                 time.sleep(30)
 
     # 4. Download
+    failed_downloads = []
     if config.download and effective_artifacts:
         dashboard.update_status(key, "msg", "Downloading...")
-        fname = safe_filename(key)
-        for art_cfg in effective_artifacts:
-            if not state.is_download_done(key, art_cfg.type):
-                ext_map = {
-                    "audio": ".m4a", "video": ".mp4", "slide_deck": ".pdf",
-                    "report": ".md", "flashcards": ".json", "quiz": ".json",
-                    "mind_map": ".json", "infographic": ".png", "data_table": ".csv"
-                }
-                ext = ext_map.get(art_cfg.type, ".bin")
-                
-                # Robust subdir naming
-                sub_map = {"quiz": "quizzes", "flashcards": "flashcards", "data_table": "data_tables", "slide_deck": "slide_decks"}
-                sub_dir = sub_map.get(art_cfg.type, art_cfg.type + "s")
-                
-                out_path = os.path.join(config.output_dir, sub_dir, f"{fname}{ext}")
-                os.makedirs(os.path.dirname(out_path), exist_ok=True)
-                
-                dl_type = art_cfg.type.replace("_", "-")
-                dl_args = ["download", dl_type, nb_id, "--output", out_path]
-                if art_cfg.type == "slide_deck": dl_args.extend(["--format", "pdf"])
-                
-                run_nlm(dl_args, timeout=120, log_key=key)
-                if os.path.exists(out_path):
-                    state.set_download_done(key, art_cfg.type)
-
-    dashboard.update_status(key, "msg", "[bold green]Finished[/bold green]")
+        needed_downloads = [
+            a for a in effective_artifacts
+            if a.type not in deferred | skipped
+            and not (state.is_download_done(key, a.type) and (store.verify(key, a.type) or store.adopt(key, a.type)))
+        ]
+        latest = {}
+        if needed_downloads:
+            latest = parse_latest_artifacts(run_nlm(["studio", "status", nb_id, "--json"], timeout=60, log_key=key))
+
+        for art_cfg in needed_downloads:
+            art_id = latest.get(art_cfg.type, {}).get("artifact_id")
+            # Same remote artifact already on disk and intact: nothing to fetch
+            if art_id and store.verify(key, art_cfg.type, art_id):
+                state.set_download_done(key, art_cfg.type)
+                continue
+
+            tmp_path = store.temp_path(key, art_cfg.type)
+            os.makedirs(os.path.dirname(tmp_path), exist_ok=True)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+            dl_type = art_cfg.type.replace("_", "-")
+            dl_args = ["download", dl_type, nb_id, "--output", tmp_path]
+            if art_cfg.type == "slide_deck": dl_args.extend(["--format", "pdf"])
+
+            # A timed-out or failed download can leave a truncated file behind; never keep it
+            ok, _ = run_nlm_status(dl_args, timeout=120, log_key=key)
+            if ok and store.commit(key, art_cfg.type, art_id):
+                state.set_download_done(key, art_cfg.type)
+            else:
+                store.discard(key, art_cfg.type)
+                failed_downloads.append(art_cfg.type)
+                dashboard.update_status(key, "msg", f"[red]Download failed: {art_cfg.type}[/red]")
+
+    notes = []
+    if failed_downloads: notes.append(f"download failed: {', '.join(failed_downloads)}")
+    if deferred: notes.append(f"{len(deferred)} deferred to next quota window")
+    if skipped: notes.append(f"{len(skipped)} skipped (no budget)")
+    if failed_downloads:
+        dashboard.update_status(key, "msg", f"[red]Finished; {'; '.join(notes)}[/red]")
+    elif notes:
+        dashboard.update_status(key, "msg", f"[yellow]Finished; {'; '.join(notes)}[/yellow]")
+    else:
+        dashboard.update_status(key, "msg", "[bold green]Finished[/bold green]")
 
 def main():
     import argparse
@@ -297,6 +359,16 @@ def main():
         CONSOLE.print(f"[red]Error: {args.config} not found. Ensure the AI has created it.[/red]")
         sys.exit(1)
 
+    # Fail fast on bad input before logging in or touching any notebook
+    errors = validate_config(args.config)
+    if errors:
+        CONSOLE.print(f"[bold red]Invalid config ({len(errors)} problem(s)):[/bold red]")
+        for err in errors[:50]:
+            CONSOLE.print(f"  [red]{err}[/red]")
+        if len(errors) > 50:
+            CONSOLE.print(f"  [red]... and {len(errors) - 50} more[/red]")
+        sys.exit(1)
+
     CONSOLE.print("[bold blue]Ensuring Authentication via `uv run nlm login`...[/bold blue]")
     try:
         res = subprocess.run(["uv", "run", "nlm", "login"], check=True)
@@ -311,36 +383,78 @@ def main():
 
     state = StateManager("state.json")
 
+    # Build per-topic artifact map for the dashboard (one streaming pass; topics themselves aren't kept)
+    topic_artifact_map = {}
+    new_notebook_keys = []
+    for t in iter_topics(config):
+        topic_artifact_map[t.key] = [a.type for a in (t.artifacts if t.artifacts is not None else config.artifacts)]
+        if not t.notebook_id and not state.get_notebook_id(t.key):
+            new_notebook_keys.append(t.key)
+
     # Collect all unique artifact types across all topics (union of global + per-topic)
     all_artifact_types = list(dict.fromkeys(
         [a.type for a in config.artifacts] +
-        [a.type for t in config.topics if t.artifacts for a in t.artifacts]
+        [art for arts in topic_artifact_map.values() for art in arts]
     ))
 
-    # Build per-topic artifact map for the dashboard
-    topic_artifact_map = {
-        t.key: [a.type for a in (t.artifacts if t.artifacts is not None else config.artifacts)]
-        for t in config.topics
-    }
+    store = OutputStore(config.output_dir, state, list(topic_artifact_map))
 
-    dashboard = StatusDashboard([t.key for t in config.topics], all_artifact_types, topic_artifact_map)
+    # Fit this run's creates into the configured quota budgets; the rest waits for later windows
+    quota = None
+    if config.quota:
+        quota = QuotaPlanner(config.quota, state)
+        quota.plan_windows(quota.estimate(iter_topics(config), config, topic_artifact_map))
+        CONSOLE.print(quota.summary() + "\n")
+
+    dashboard = StatusDashboard(list(topic_artifact_map), all_artifact_types, topic_artifact_map)
+
+    pool = None
+    if config.notebook_pool > 0:
+        demand_count = len([k for k in new_notebook_keys if not (quota and quota.is_deferred(k))])
+        pool = NotebookPool(state, config.notebook_pool, demand_count)
+        pool.start()
+    max_workers = config.max_workers or max(len(topic_artifact_map), 1)
 
     with Live(dashboard.generate_table(), console=CONSOLE, refresh_per_second=2) as live:
-        with ThreadPoolExecutor(max_workers=len(config.topics)) as executor:
-            futures = {executor.submit(topic_worker, topic, config, state, dashboard, i): topic.key for i, topic in enumerate(config.topics)}
-            
-            while any(f.running() for f in futures.keys()):
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Topics are pulled from the (possibly streamed) manifest only as worker slots free up
+            topics = iter_topics(config)
+            futures = {}
+            submitted = 0
+            exhausted = False
+            while True:
+                while not exhausted and len(futures) < max_workers:
+                    topic = next(topics, None)
+                    if topic is None:
+                        exhausted = True
+                        break
+                    if quota and quota.is_deferred(topic.key):
+                        dashboard.update_status(topic.key, "msg", "[yellow]Deferred to next quota window[/yellow]")
+                        continue
+                    # Only the first wave is staggered; later topics start as earlier ones finish
+                    stagger = submitted if submitted < max_workers else 0
+                    futures[executor.submit(topic_worker, topic, config, state, dashboard, store, stagger, quota, pool)] = topic.key
+                    submitted += 1
+
+                for future in [f for f in futures if f.done()]:
+                    key = futures.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        dashboard.update_status(key, "msg", f"[red]Crash: {e}[/red]")
+
+                if exhausted and not futures:
+                    break
                 live.update(dashboard.generate_table())
                 time.sleep(0.5)
             
-            for future in as_completed(futures):
-                try:
-                    future.result()
-                except Exception as e:
-                    dashboard.update_status(futures[future], "msg", f"[red]Crash: {e}[/red]")
-            
             live.update(dashboard.generate_table())
 
+    if pool:
+        pool.stop()
+        if state.pooled_notebook_count():
+            CONSOLE.print(f"[dim]{state.pooled_notebook_count()} pre-created notebook(s) kept for the next run.[/dim]")
+
     CONSOLE.print("\n[bold green]Automation Pipeline Finished.[/bold green]")
 
 if __name__ == "__main__":
@@ -1,4 +1,7 @@
-from .config import load_config, save_config, PipelineConfig, TopicConfig, ArtifactConfig
-from .nlm_runner import run_nlm, extract_notebook_id, extract_task_id, parse_latest_artifacts, safe_filename
+from .config import load_config, save_config, validate_config, iter_topics, PipelineConfig, TopicConfig, ArtifactConfig, QuotaConfig
+from .nlm_runner import run_nlm, run_nlm_status, extract_notebook_id, extract_task_id, parse_latest_artifacts, safe_filename
 from .state import StateManager
 from .dashboard import StatusDashboard
+from .quota import QuotaPlanner
+from .output_store import OutputStore
+from .notebook_pool import NotebookPool
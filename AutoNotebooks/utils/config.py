@@ -1,6 +1,22 @@
 from dataclasses import dataclass, field
 import json
-from typing import List, Optional, Dict, Any
+import os
+import re
+from typing import List, Optional, Dict, Any, Iterator, Tuple
+
+SOURCE_TYPES = ("url", "file", "text", "drive", "youtube")
+ARTIFACT_TYPES = ("audio", "video", "slide_deck", "report", "flashcards", "quiz", "mind_map", "infographic", "data_table")
+CHAT_GOALS = ("default", "learning_guide", "custom")
+CHAT_RESPONSE_LENGTHS = ("default", "longer", "shorter")
+RESEARCH_MODES = ("fast", "deep")
+RESEARCH_SOURCES = ("web", "drive")
+# Set by the runner itself; passing them as artifact flags would duplicate them on the command line
+RESERVED_FLAGS = ("confirm", "focus", "language", "source_ids")
+FLAG_NAME = re.compile(r'^[a-z][a-z0-9_-]*$')
+PIPELINE_FIELDS = (
+    "topics", "research_mode", "research_source", "research_force", "artifacts", "download",
+    "output_dir", "language", "focus_prompt", "quota", "topics_manifest", "max_workers", "notebook_pool"
+)
 
 @dataclass
 class SourceConfig:
@@ -34,6 +50,12 @@ class TopicConfig:
     chat: Optional[ChatConfig] = None
     artifacts: Optional[List['ArtifactConfig']] = None  # Per-topic override; None = use global
 
+@dataclass
+class QuotaConfig:
+    window_hours: float = 24.0 # Length of one quota window
+    budgets: Dict[str, int] = field(default_factory=dict) # create type (artifact type or "research") -> max creates per window; omitted = unlimited
+    total: Optional[int] = None # Max creates of any type per window
+
 @dataclass
 class PipelineConfig:
     topics: List[TopicConfig]
@@ -45,51 +67,79 @@ class PipelineConfig:
     output_dir: str = "./output"
     language: str = "en"
     focus_prompt: Optional[str] = None
+    quota: Optional[QuotaConfig] = None
+    topics_manifest: Optional[str] = None # JSONL file, one topic object per line; read lazily after inline topics
+    max_workers: Optional[int] = None # Topics processed concurrently; None = all at once
+    notebook_pool: int = 0 # Notebooks to pre-create ahead of topics that need one; 0 = disabled
+
+def _parse_artifact(a: dict) -> ArtifactConfig:
+    return ArtifactConfig(
+        type=a["type"],
+        flags=a.get("flags", {}),
+        focus=a.get("focus"),
+        language=a.get("language"),
+        source_ids=a.get("source_ids", []),
+        rename=a.get("rename"),
+        revision_instructions=a.get("revision_instructions", [])
+    )
+
+def _parse_topic(t: dict) -> TopicConfig:
+    sources = [SourceConfig(**s) for s in t.get("sources", [])]
+    chat = None
+    if t.get("chat") is not None:
+        chat = ChatConfig(**t["chat"])
+    topic_artifacts = None
+    if t.get("artifacts") is not None:
+        topic_artifacts = [_parse_artifact(a) for a in t["artifacts"]]
+    return TopicConfig(
+        key=t["key"],
+        title=t["title"],
+        query=t.get("query"),
+        sources=sources,
+        notebook_id=t.get("notebook_id"),
+        chat=chat,
+        artifacts=topic_artifacts
+    )
+
+def _resolve_manifest(config_path: str, manifest: Optional[str]) -> Optional[str]:
+    if manifest is None or os.path.isabs(manifest):
+        return manifest
+    return os.path.join(os.path.dirname(config_path), manifest)
+
+def _relative_manifest(config_path: str, manifest: Optional[str]) -> Optional[str]:
+    """Inverse of _resolve_manifest: the path as it should be written into config_path."""
+    if manifest is None or os.path.isabs(manifest):
+        return manifest
+    try:
+        return os.path.relpath(manifest, os.path.dirname(os.path.abspath(config_path)))
+    except ValueError:
+        return os.path.abspath(manifest)  # Different drive on Windows
+
+def _manifest_lines(path: str) -> Iterator[Tuple[str, str]]:
+    """Yields (location, line) for every non-blank line, one at a time."""
+    with open(path, 'r') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if line:
+                yield f"{path}:{lineno}", line
+
+def iter_topics(config: PipelineConfig) -> Iterator[TopicConfig]:
+    """Inline topics first, then the manifest streamed line by line."""
+    yield from config.topics
+    if config.topics_manifest:
+        for _, line in _manifest_lines(config.topics_manifest):
+            yield _parse_topic(json.loads(line))
 
 def load_config(path: str) -> PipelineConfig:
     with open(path, 'r') as f:
         data = json.load(f)
     
-    topics = []
-    for t in data.get("topics", []):
-        sources = [SourceConfig(**s) for s in t.get("sources", [])]
-        chat = None
-        if t.get("chat") is not None:
-            chat = ChatConfig(**t["chat"])
-        topic_artifacts = None
-        if "artifacts" in t:
-            topic_artifacts = []
-            for a in t["artifacts"]:
-                topic_artifacts.append(ArtifactConfig(
-                    type=a["type"],
-                    flags=a.get("flags", {}),
-                    focus=a.get("focus"),
-                    language=a.get("language"),
-                    source_ids=a.get("source_ids", []),
-                    rename=a.get("rename"),
-                    revision_instructions=a.get("revision_instructions", [])
-                ))
-        topics.append(TopicConfig(
-            key=t["key"],
-            title=t["title"],
-            query=t.get("query"),
-            sources=sources,
-            notebook_id=t.get("notebook_id"),
-            chat=chat,
-            artifacts=topic_artifacts
-        ))
-        
-    artifacts = []
-    for a in data.get("artifacts", []):
-        artifacts.append(ArtifactConfig(
-            type=a["type"],
-            flags=a.get("flags", {}),
-            focus=a.get("focus"),
-            language=a.get("language"),
-            source_ids=a.get("source_ids", []),
-            rename=a.get("rename"),
-            revision_instructions=a.get("revision_instructions", [])
-        ))
+    topics = [_parse_topic(t) for t in data.get("topics", [])]
+    artifacts = [_parse_artifact(a) for a in data.get("artifacts", [])]
+
+    quota = None
+    if data.get("quota") is not None:
+        quota = QuotaConfig(**data["quota"])
     
     return PipelineConfig(
         topics=topics,
@@ -100,9 +150,184 @@ def load_config(path: str) -> PipelineConfig:
         download=data.get("download", True),
         output_dir=data.get("output_dir", "./output"),
         language=data.get("language", "en"),
-        focus_prompt=data.get("focus_prompt")
+        focus_prompt=data.get("focus_prompt"),
+        quota=quota,
+        topics_manifest=_resolve_manifest(path, data.get("topics_manifest")),
+        max_workers=data.get("max_workers"),
+        notebook_pool=data.get("notebook_pool", 0)
     )
 
+def _is_int(value: Any) -> bool:
+    # bool is an int subclass, but `true` is never a sensible count
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _check_fields(obj: dict, allowed: tuple, where: str) -> List[str]:
+    return [f"{where}: unknown field '{name}'" for name in obj if name not in allowed]
+
+def _validate_artifact(a: Any, where: str) -> List[str]:
+    if not isinstance(a, dict):
+        return [f"{where}: artifact must be an object"]
+    errors = _check_fields(a, ("type", "flags", "focus", "language", "source_ids", "rename", "revision_instructions"), where)
+    if a.get("type") not in ARTIFACT_TYPES:
+        errors.append(f"{where}: unknown artifact type {a.get('type')!r} (expected one of {', '.join(ARTIFACT_TYPES)})")
+    flags = a.get("flags", {})
+    if not isinstance(flags, dict):
+        errors.append(f"{where}.flags: must be an object")
+        flags = {}
+    for name in flags:
+        if not FLAG_NAME.match(name):
+            errors.append(f"{where}.flags: invalid flag name {name!r}")
+        elif name.replace("-", "_") in RESERVED_FLAGS:
+            errors.append(f"{where}.flags: '{name}' is set by the runner; use the artifact's own field instead")
+    source_ids = a.get("source_ids", [])
+    if not isinstance(source_ids, list) or not all(isinstance(sid, str) for sid in source_ids):
+        errors.append(f"{where}.source_ids: must be a list of strings")
+    revisions = a.get("revision_instructions", [])
+    if revisions and a.get("type") != "slide_deck":
+        errors.append(f"{where}.revision_instructions: only supported for slide_deck")
+    for i, ri in enumerate(revisions if isinstance(revisions, list) else [None]):
+        if not isinstance(ri, dict) or "slide" not in ri or "instruction" not in ri:
+            errors.append(f"{where}.revision_instructions[{i}]: needs 'slide' and 'instruction'")
+    return errors
+
+def _validate_topic(t: Any, where: str) -> List[str]:
+    if not isinstance(t, dict):
+        return [f"{where}: topic must be an object"]
+    errors = _check_fields(t, ("key", "title", "query", "sources", "notebook_id", "chat", "artifacts"), where)
+    for name in ("key", "title"):
+        if not isinstance(t.get(name), str) or not t[name].strip():
+            errors.append(f"{where}: missing '{name}'")
+    sources = t.get("sources", [])
+    if not isinstance(sources, list):
+        errors.append(f"{where}.sources: must be a list")
+        sources = []
+    for i, src in enumerate(sources):
+        src_where = f"{where}.sources[{i}]"
+        if not isinstance(src, dict):
+            errors.append(f"{src_where}: source must be an object")
+            continue
+        errors += _check_fields(src, ("type", "value", "title"), src_where)
+        if src.get("type") not in SOURCE_TYPES:
+            errors.append(f"{src_where}: unknown source type {src.get('type')!r} (expected one of {', '.join(SOURCE_TYPES)})")
+        if not isinstance(src.get("value"), str) or not src["value"]:
+            errors.append(f"{src_where}: missing 'value'")
+        elif src.get("type") == "file" and not os.path.isfile(src["value"]):
+            errors.append(f"{src_where}: file not found: {src['value']}")
+    chat = t.get("chat")
+    if chat is not None:
+        if not isinstance(chat, dict):
+            errors.append(f"{where}.chat: must be an object")
+        else:
+            errors += _check_fields(chat, ("goal", "prompt", "response_length"), f"{where}.chat")
+            if chat.get("goal", "default") not in CHAT_GOALS:
+                errors.append(f"{where}.chat: unknown goal {chat.get('goal')!r}")
+            if chat.get("response_length", "default") not in CHAT_RESPONSE_LENGTHS:
+                errors.append(f"{where}.chat: unknown response_length {chat.get('response_length')!r}")
+    artifacts = t.get("artifacts")
+    if artifacts is not None:
+        if not isinstance(artifacts, list):
+            errors.append(f"{where}.artifacts: must be a list")
+        else:
+            for i, a in enumerate(artifacts):
+                errors += _validate_artifact(a, f"{where}.artifacts[{i}]")
+    return errors
+
+def validate_config(path: str) -> List[str]:
+    """
+    Checks the config and its topic manifest without building topics or making any network call.
+    The manifest is streamed, so this stays fast and flat in memory for very large batches.
+    Returns a list of human-readable problems; empty means the config is runnable.
+    """
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        return [f"{path}: {e}"]
+    if not isinstance(data, dict):
+        return [f"{path}: config must be a JSON object"]
+
+    errors = _check_fields(data, PIPELINE_FIELDS, "config")
+    if data.get("research_mode", "fast") not in RESEARCH_MODES:
+        errors.append(f"research_mode: expected one of {', '.join(RESEARCH_MODES)}")
+    if data.get("research_source", "web") not in RESEARCH_SOURCES:
+        errors.append(f"research_source: expected one of {', '.join(RESEARCH_SOURCES)}")
+    for name in ("research_force", "download"):
+        if not isinstance(data.get(name, True), bool):
+            errors.append(f"{name}: must be true or false")
+    for name in ("output_dir", "language", "focus_prompt", "topics_manifest"):
+        if data.get(name) is not None and not isinstance(data[name], str):
+            errors.append(f"{name}: must be a string")
+    max_workers = data.get("max_workers")
+    if max_workers is not None and (not _is_int(max_workers) or max_workers < 1):
+        errors.append("max_workers: must be a positive integer")
+    notebook_pool = data.get("notebook_pool", 0)
+    if not _is_int(notebook_pool) or notebook_pool < 0:
+        errors.append("notebook_pool: must be a non-negative integer")
+
+    artifacts = data.get("artifacts", [])
+    if not isinstance(artifacts, list):
+        errors.append("artifacts: must be a list")
+        artifacts = []
+    for i, a in enumerate(artifacts):
+        errors += _validate_artifact(a, f"artifacts[{i}]")
+
+    quota = data.get("quota")
+    if quota is not None:
+        if not isinstance(quota, dict):
+            errors.append("quota: must be an object")
+        else:
+            errors += _check_fields(quota, ("window_hours", "budgets", "total"), "quota")
+            window_hours = quota.get("window_hours", 24.0)
+            if not isinstance(window_hours, (int, float)) or isinstance(window_hours, bool) or window_hours <= 0:
+                errors.append("quota.window_hours: must be a number greater than 0")
+            total = quota.get("total")
+            if total is not None and (not _is_int(total) or total < 0):
+                errors.append("quota.total: must be a non-negative integer")
+            budgets = quota.get("budgets", {})
+            if not isinstance(budgets, dict):
+                errors.append("quota.budgets: must be an object")
+                budgets = {}
+            for name, limit in budgets.items():
+                if name not in ARTIFACT_TYPES and name != "research":
+                    errors.append(f"quota.budgets: unknown create type {name!r}")
+                if not _is_int(limit) or limit < 0:
+                    errors.append(f"quota.budgets.{name}: must be a non-negative integer")
+
+    seen = {}
+    def check(t: Any, where: str):
+        errors.extend(_validate_topic(t, where))
+        key = t.get("key") if isinstance(t, dict) else None
+        if isinstance(key, str):
+            if key in seen:
+                errors.append(f"{where}: duplicate key '{key}' (first defined at {seen[key]})")
+            else:
+                seen[key] = where
+
+    topics = data.get("topics", [])
+    if not isinstance(topics, list):
+        errors.append("topics: must be a list")
+        topics = []
+    for i, t in enumerate(topics):
+        check(t, f"topics[{i}]")
+
+    manifest = data.get("topics_manifest")
+    manifest = _resolve_manifest(path, manifest) if isinstance(manifest, str) else None
+    if manifest is not None:
+        if not os.path.isfile(manifest):
+            errors.append(f"topics_manifest: file not found: {manifest}")
+        else:
+            for where, line in _manifest_lines(manifest):
+                try:
+                    t = json.loads(line)
+                except json.JSONDecodeError as e:
+                    errors.append(f"{where}: invalid JSON ({e.msg})")
+                    continue
+                check(t, where)
+
+    if not seen and not errors:
+        errors.append("no topics defined (add 'topics' or 'topics_manifest')")
+    return errors
+
 def save_config(config: PipelineConfig, path: str):
     data = {
         "topics": [{
@@ -133,7 +358,11 @@ def save_config(config: PipelineConfig, path: str):
         "download": config.download,
         "output_dir": config.output_dir,
         "language": config.language,
-        "focus_prompt": config.focus_prompt
+        "focus_prompt": config.focus_prompt,
+        "quota": vars(config.quota) if config.quota else None,
+        "topics_manifest": _relative_manifest(path, config.topics_manifest),
+        "max_workers": config.max_workers,
+        "notebook_pool": config.notebook_pool
     }
     with open(path, 'w') as f:
         json.dump(data, f, indent=2)
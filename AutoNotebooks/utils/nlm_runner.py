@@ -6,6 +6,10 @@ import time
 from datetime import datetime
 
 def run_nlm(args: list[str], timeout: int = 300, log_key: str = None) -> str:
+    return run_nlm_status(args, timeout=timeout, log_key=log_key)[1]
+
+def run_nlm_status(args: list[str], timeout: int = 300, log_key: str = None) -> tuple[bool, str]:
+    """Like run_nlm, but also reports whether the command exited 0 (False on timeout or exception)."""
     cmd = ["uv", "run", "nlm"] + args
     
     log_dir = "logs"
@@ -18,6 +22,7 @@ def run_nlm(args: list[str], timeout: int = 300, log_key: str = None) -> str:
         log_file = None
 
     output = ""
+    ok = False
     try:
         result = subprocess.run(
             cmd,
@@ -27,6 +32,7 @@ def run_nlm(args: list[str], timeout: int = 300, log_key: str = None) -> str:
         )
         output = result.stdout.strip()
         error_output = result.stderr.strip()
+        ok = result.returncode == 0
         
         if log_file:
             with open(log_file, "a") as f:
@@ -51,7 +57,7 @@ def run_nlm(args: list[str], timeout: int = 300, log_key: str = None) -> str:
         output = ""
         
     time.sleep(5)
-    return output
+    return ok, output
 
 def extract_notebook_id(output: str) -> str:
     match = re.search(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', output, re.IGNORECASE)
@@ -0,0 +1,75 @@
+import threading
+
+from .nlm_runner import run_nlm, run_nlm_status, extract_notebook_id
+from .state import StateManager
+
+POOL_TITLE = "AutoNotebooks (unassigned)"
+LOG_KEY = "notebook_pool"
+
+class NotebookPool:
+    def __init__(self, state: StateManager, size: int, demand: int):
+        """
+        Creates notebooks in the background so topics don't wait on `create notebook`.
+
+        size: most unassigned notebooks kept ready at once.
+        demand: topics in this run that still need a new notebook; nothing beyond that is created.
+        Unused notebooks stay in state and are handed out first on the next run.
+        """
+        self.state = state
+        self.size = size
+        self.remaining = demand
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._fill, name="notebook-pool", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def _wanted(self) -> bool:
+        with self.lock:
+            return self.state.pooled_notebook_count() < min(self.size, self.remaining)
+
+    def _fill(self):
+        failures = 0
+        while not self.stop_event.is_set():
+            if not self._wanted():
+                self.stop_event.wait(1)
+                continue
+            nb_id = extract_notebook_id(run_nlm(["create", "notebook", POOL_TITLE], log_key=LOG_KEY))
+            if nb_id:
+                self.state.add_pooled_notebook(nb_id)
+                failures = 0
+            else:
+                # Topics fall back to creating their own; don't hammer a failing endpoint
+                failures += 1
+                if failures >= 3:
+                    return
+                self.stop_event.wait(10)
+
+    def acquire(self, key: str, title: str) -> str:
+        """
+        Assigns a pooled notebook to the topic and sets its title.
+        Returns "" when the pool is empty or the rename fails, in which case the caller creates one itself.
+        """
+        with self.lock:
+            self.remaining = max(self.remaining - 1, 0)
+        while True:
+            # Recorded against the topic before renaming, so the id is never held only in memory
+            nb_id = self.state.assign_pooled_notebook(key)
+            if not nb_id:
+                return ""
+            ok, _ = run_nlm_status(["rename", "notebook", nb_id, title], timeout=60, log_key=key)
+            if ok:
+                return nb_id
+            # Pooled notebooks from earlier runs may have been deleted since; only a definite
+            # not-found drops the id. Anything else (rate limit, auth) keeps it for later.
+            v_out = run_nlm(["get", "notebook", nb_id], timeout=30, log_key=key)
+            if "not found" in v_out.lower():
+                self.state.unassign_pooled_notebook(key, keep=False)
+                continue
+            self.state.unassign_pooled_notebook(key, keep=True)
+            return ""
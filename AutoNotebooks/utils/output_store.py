@@ -0,0 +1,164 @@
+import hashlib
+import os
+import threading
+
+from .nlm_runner import safe_filename
+from .state import StateManager
+
+EXT_MAP = {
+    "audio": ".m4a", "video": ".mp4", "slide_deck": ".pdf",
+    "report": ".md", "flashcards": ".json", "quiz": ".json",
+    "mind_map": ".json", "infographic": ".png", "data_table": ".csv"
+}
+
+# Robust subdir naming
+SUB_MAP = {"quiz": "quizzes", "flashcards": "flashcards", "data_table": "data_tables", "slide_deck": "slide_decks"}
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class OutputStore:
+    def __init__(self, output_dir: str, state: StateManager, topic_keys: list):
+        """
+        Tracks downloaded files by size and SHA-256 so resumes can trust (or reject) what is on disk.
+
+        topic_keys: all keys in config order. Keys that collapse to the same safe_filename share
+            the plain name with whichever key already has files stored under it (or, if none
+            does, the first key); the others get a short key hash appended. Names stay stable
+            across runs regardless of later config reordering.
+        """
+        self.output_dir = output_dir
+        self.state = state
+        self.lock = threading.Lock()
+
+        # Stems already on disk, as recorded by earlier runs
+        recorded = {}
+        for key, paths in state.get_output_paths().items():
+            if paths:
+                recorded[key] = os.path.splitext(os.path.basename(paths[0]))[0]
+        taken = set(recorded.values())
+
+        self.stems = {}
+        for key in topic_keys:
+            if key in recorded:
+                self.stems[key] = recorded[key]
+                continue
+            fname = safe_filename(key)
+            if fname in taken:
+                fname = f"{fname}_{hashlib.sha1(key.encode()).hexdigest()[:8]}"
+            self.stems[key] = fname
+            taken.add(fname)
+
+    def path_for(self, key: str, type: str) -> str:
+        ext = EXT_MAP.get(type, ".bin")
+        sub_dir = SUB_MAP.get(type, type + "s")
+        stem = self.stems.get(key, safe_filename(key))
+        return os.path.join(self.output_dir, sub_dir, f"{stem}{ext}")
+
+    def temp_path(self, key: str, type: str) -> str:
+        # Keep the real extension last so the CLI still recognises the format
+        stem, ext = os.path.splitext(self.path_for(key, type))
+        return f"{stem}.part{ext}"
+
+    def discard(self, key: str, type: str):
+        """Removes a failed or partial download so it can never be committed."""
+        tmp_path = self.temp_path(key, type)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    def verify(self, key: str, type: str, artifact_id: str = None) -> bool:
+        """
+        True if the recorded file is intact and, when artifact_id is given, came from that artifact.
+        Size + mtime matching the record is trusted; anything else is re-hashed.
+        """
+        record = self.state.get_output(key, type)
+        if not record:
+            return False
+        if artifact_id and record.get("artifact_id") != artifact_id:
+            return False
+        path = record["path"]
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != record["size"]:
+            return False
+        if st.st_mtime_ns == record.get("mtime_ns"):
+            return True
+        if file_sha256(path) != record["sha256"]:
+            return False
+        record["mtime_ns"] = st.st_mtime_ns
+        self.state.set_output(key, type, record)
+        return True
+
+    def adopt(self, key: str, type: str) -> bool:
+        """
+        Records a file downloaded before the store existed (download marked done, no record yet).
+        The remote artifact id is unknown, so a newer remote artifact still triggers a re-download.
+        """
+        if self.state.get_output(key, type):
+            return False
+        out_path = self.path_for(key, type)
+        try:
+            st = os.stat(out_path)
+        except OSError:
+            return False
+        if st.st_size == 0:
+            return False
+        self.state.set_output(key, type, {
+            "path": out_path,
+            "size": st.st_size,
+            "sha256": file_sha256(out_path),
+            "mtime_ns": st.st_mtime_ns,
+            "artifact_id": None,
+        })
+        return True
+
+    def commit(self, key: str, type: str, artifact_id: str = None) -> bool:
+        """
+        Moves a finished download from temp_path() into place and records it.
+        Only call this once the download command has exited successfully.
+        Content already stored elsewhere is hardlinked instead of kept as a second copy.
+        """
+        tmp_path = self.temp_path(key, type)
+        out_path = self.path_for(key, type)
+        if not os.path.exists(tmp_path):
+            return False
+        if os.path.getsize(tmp_path) == 0:
+            os.remove(tmp_path)
+            return False
+
+        sha256 = file_sha256(tmp_path)
+        with self.lock:
+            for existing in self.state.find_outputs_by_hash(sha256):
+                src = existing["path"]
+                if os.path.abspath(src) == os.path.abspath(out_path) or not os.path.exists(src):
+                    continue
+                if os.path.getsize(src) != existing["size"]:
+                    continue
+                link_path = os.path.splitext(tmp_path)[0] + ".link"
+                try:
+                    if os.path.exists(link_path):
+                        os.remove(link_path)
+                    os.link(src, link_path)
+                except OSError:
+                    continue  # e.g. different filesystem; keep the downloaded copy
+                os.replace(link_path, out_path)
+                os.remove(tmp_path)
+                break
+            else:
+                os.replace(tmp_path, out_path)
+
+            st = os.stat(out_path)
+            self.state.set_output(key, type, {
+                "path": out_path,
+                "size": st.st_size,
+                "sha256": sha256,
+                "mtime_ns": st.st_mtime_ns,
+                "artifact_id": artifact_id,
+            })
+        return True
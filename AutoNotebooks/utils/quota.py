@@ -0,0 +1,152 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from .config import PipelineConfig, QuotaConfig, TopicConfig
+from .state import StateManager
+
+class QuotaPlanner:
+    def __init__(self, quota: QuotaConfig, state: StateManager):
+        """
+        Spreads creates (research runs and artifacts) across fixed-length quota windows.
+
+        plan: list of {topic_key: [create types]}, one dict per window.
+            plan[0] is the current window; later windows are picked up by later runs.
+        """
+        self.quota = quota
+        self.state = state
+        self.lock = threading.Lock()
+        self.window_seconds = quota.window_hours * 3600
+
+        previous = state.get_quota()
+        # A batch spans runs until its plan is empty. Within one batch each topic's research is
+        # force-restarted at most once; a fresh batch forces everything again.
+        if any(previous["plan"]):
+            self.force_done = set(previous["force_done"])
+        else:
+            self.force_done = set()
+            if previous["force_done"]:
+                state.reset_quota_force_done()
+
+        self.window_start = previous["window_start"]
+        if self.window_start is None or time.time() - self.window_start >= self.window_seconds:
+            self.window_start = time.time()
+            state.start_quota_window(self.window_start)
+
+        self.plan: List[Dict[str, List[str]]] = [{}]
+        self.unschedulable: Dict[str, List[str]] = {}
+
+    def is_force_done(self, key: str) -> bool:
+        """True if this batch already force-restarted the topic's research in an earlier run."""
+        return key in self.force_done
+
+    def estimate(self, topics: Iterable[TopicConfig], config: PipelineConfig, topic_artifact_map: dict) -> Dict[str, List[str]]:
+        """Returns {topic_key: [create types]} still needed, mirroring topic_worker's skip logic."""
+        demand = {}
+        for topic in topics:
+            key = topic.key
+            research_done = self.state.is_research_done(key)
+            force = config.research_force and not self.is_force_done(key)
+            items = []
+            if topic.query and (force or not research_done):
+                items.append("research")
+            for art in topic_artifact_map.get(key, []):
+                # A forced research restart wipes the topic's finished artifacts too
+                if (force and research_done) or not self.state.is_artifact_done(key, art):
+                    items.append(art)
+            if items:
+                demand[key] = items
+        return demand
+
+    def plan_windows(self, demand: Dict[str, List[str]]) -> List[Dict[str, List[str]]]:
+        used = self.state.get_quota()["used"]
+        total_used = sum(used.values())
+
+        plan = [{}]
+        counts = [dict(used)]
+        totals = [total_used]
+        unschedulable = {}
+
+        for key, items in demand.items():
+            # A topic's creates never land before the ones preceding them (research before artifacts)
+            floor = 0
+            for art in items:
+                limit = self.quota.budgets.get(art)
+                if limit == 0 or self.quota.total == 0:
+                    unschedulable.setdefault(key, []).append(art)
+                    continue
+                w = floor
+                while True:
+                    if w == len(plan):
+                        plan.append({})
+                        counts.append({})
+                        totals.append(0)
+                    fits_type = limit is None or counts[w].get(art, 0) < limit
+                    fits_total = self.quota.total is None or totals[w] < self.quota.total
+                    if fits_type and fits_total:
+                        break
+                    w += 1
+                plan[w].setdefault(key, []).append(art)
+                counts[w][art] = counts[w].get(art, 0) + 1
+                totals[w] += 1
+                floor = w
+
+        with self.lock:
+            self.plan = plan
+            self.unschedulable = unschedulable
+        self.state.set_quota_plan(plan)
+        return plan
+
+    def is_deferred(self, key: str) -> bool:
+        """True if the topic has work planned for later windows but none in the current one."""
+        with self.lock:
+            if self.plan[0].get(key):
+                return False
+            return any(key in window for window in self.plan[1:])
+
+    def is_unschedulable(self, key: str, type: str) -> bool:
+        """True if the create has no budget at all; it is skipped rather than deferred."""
+        return self.quota.budgets.get(type) == 0 or self.quota.total == 0
+
+    def _has_room(self, type: str) -> bool:
+        # Live usage plus what is still planned for this window, so unplanned claims never
+        # take a slot a planned create is counting on
+        used = self.state.get_quota()["used"]
+        planned = [t for items in self.plan[0].values() for t in items]
+        limit = self.quota.budgets.get(type)
+        fits_type = limit is None or used.get(type, 0) + planned.count(type) < limit
+        fits_total = self.quota.total is None or sum(used.values()) + len(planned) < self.quota.total
+        return fits_type and fits_total
+
+    def reserve(self, key: str, type: str) -> bool:
+        """
+        Claims a create in the current window. Planned creates always succeed; creates that became
+        necessary mid-run (e.g. a missing notebook cleared the topic) succeed while the window has room.
+        False means it is deferred or unschedulable.
+        """
+        with self.lock:
+            scheduled = self.plan[0].get(key, [])
+            if type in scheduled:
+                scheduled.remove(type)
+            elif self.is_unschedulable(key, type) or not self._has_room(type):
+                return False
+            self.state.record_quota_use(key, type)
+        if type == "research":
+            self.state.mark_quota_force_done(key)
+        return True
+
+    def summary(self) -> str:
+        with self.lock:
+            now_count = sum(len(v) for v in self.plan[0].values())
+            later_count = sum(len(v) for w in self.plan[1:] for v in w.values())
+            lines = [f"[bold blue]Quota plan:[/bold blue] {now_count} creates this window, {later_count} deferred"]
+            if later_count:
+                next_start = datetime.fromtimestamp(self.window_start + self.window_seconds)
+                lines.append(
+                    f"  Remaining work spans {len(self.plan) - 1} more window(s); "
+                    f"re-run after {next_start.strftime('%Y-%m-%d %H:%M')} to continue."
+                )
+            for key, items in self.unschedulable.items():
+                lines.append(f"  [red]{key}: skipping {', '.join(items)} (budget is 0; raise it to generate these)[/red]")
+            return "\n".join(lines)
@@ -20,6 +20,9 @@ class StateManager:
             "research_done": [],    # list of keys
             "artifacts_done": {},   # key -> list of types
             "downloads_done": {},   # key -> list of types
+            "quota": {},            # window start, per-type usage and remaining plan
+            "outputs": {},          # key -> type -> {path, size, sha256, mtime_ns, artifact_id}
+            "notebook_pool": [],    # pre-created notebook ids not yet assigned to a topic
         }
 
     def save(self):
@@ -39,6 +42,34 @@ class StateManager:
             self.state["notebooks"][key] = nb_id
         self.save()
 
+    def pooled_notebook_count(self) -> int:
+        with self.lock:
+            return len(self.state.get("notebook_pool", []))
+
+    def add_pooled_notebook(self, nb_id: str):
+        with self.lock:
+            self.state.setdefault("notebook_pool", []).append(nb_id)
+        self.save()
+
+    def assign_pooled_notebook(self, key: str) -> str:
+        # Moved from the pool to the topic in a single save, so a crash can't orphan the id
+        with self.lock:
+            pool = self.state.setdefault("notebook_pool", [])
+            nb_id = pool.pop(0) if pool else None
+            if nb_id:
+                self.state["notebooks"][key] = nb_id
+        if nb_id:
+            self.save()
+        return nb_id
+
+    def unassign_pooled_notebook(self, key: str, keep: bool):
+        """Undoes assign_pooled_notebook; keep=False drops the id (the notebook no longer exists)."""
+        with self.lock:
+            nb_id = self.state["notebooks"].pop(key, None)
+            if keep and nb_id:
+                self.state.setdefault("notebook_pool", []).append(nb_id)
+        self.save()
+
     def is_research_done(self, key: str) -> bool:
         with self.lock:
             return key in self.state["research_done"]
@@ -75,6 +106,32 @@ class StateManager:
                 self.state["downloads_done"][key].append(type)
         self.save()
 
+    def get_output(self, key: str, type: str) -> dict:
+        with self.lock:
+            record = self.state.get("outputs", {}).get(key, {}).get(type)
+            return dict(record) if record else None
+
+    def set_output(self, key: str, type: str, record: dict):
+        with self.lock:
+            self.state.setdefault("outputs", {}).setdefault(key, {})[type] = record
+        self.save()
+
+    def get_output_paths(self) -> dict:
+        with self.lock:
+            return {
+                key: [record["path"] for record in by_type.values()]
+                for key, by_type in self.state.get("outputs", {}).items()
+            }
+
+    def find_outputs_by_hash(self, sha256: str) -> list:
+        with self.lock:
+            return [
+                dict(record)
+                for by_type in self.state.get("outputs", {}).values()
+                for record in by_type.values()
+                if record.get("sha256") == sha256
+            ]
+
     def clear_topic(self, key: str):
         with self.lock:
             if key in self.state["notebooks"]:
@@ -96,3 +153,51 @@ class StateManager:
             if key in self.state["downloads_done"]:
                 del self.state["downloads_done"][key]
         self.save()
+
+    def get_quota(self) -> dict:
+        with self.lock:
+            quota = self.state.get("quota", {})
+            return {
+                "window_start": quota.get("window_start"),
+                "used": dict(quota.get("used", {})),
+                # Empty entries (left by older versions) mean nothing is outstanding for that topic
+                "plan": [{k: list(v) for k, v in w.items() if v} for w in quota.get("plan", [])],
+                "force_done": list(quota.get("force_done", [])),
+            }
+
+    def start_quota_window(self, window_start: float):
+        with self.lock:
+            quota = self.state.setdefault("quota", {})
+            quota["window_start"] = window_start
+            quota["used"] = {}
+        self.save()
+
+    def set_quota_plan(self, plan: list):
+        with self.lock:
+            # Own copy: the planner keeps mutating its plan as creates are reserved
+            self.state.setdefault("quota", {})["plan"] = [{k: list(v) for k, v in w.items()} for w in plan]
+        self.save()
+
+    def mark_quota_force_done(self, key: str):
+        with self.lock:
+            force_done = self.state.setdefault("quota", {}).setdefault("force_done", [])
+            if key not in force_done:
+                force_done.append(key)
+        self.save()
+
+    def reset_quota_force_done(self):
+        with self.lock:
+            self.state.setdefault("quota", {})["force_done"] = []
+        self.save()
+
+    def record_quota_use(self, key: str, type: str):
+        with self.lock:
+            quota = self.state.setdefault("quota", {})
+            used = quota.setdefault("used", {})
+            used[type] = used.get(type, 0) + 1
+            plan = quota.get("plan", [])
+            if plan and type in plan[0].get(key, []):
+                plan[0][key].remove(type)
+                if not plan[0][key]:
+                    del plan[0][key]
+        self.save()